@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import {
   Video,
   Settings,
@@ -40,19 +40,36 @@ export function HomePage({
   const [showPreferences, setShowPreferences] = useState(false);
   const [showPermissionCheck, setShowPermissionCheck] = useState(false);
   const [preferences, setPreferences] = useState<MatchPreferences>({});
-  const [pollInterval, setPollInterval] = useState<NodeJS.Timeout | null>(null);
+  const pollIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const streamRef = useRef<AbortController | null>(null);
+
+  // ----------------------------------------
+  // STOP WAITING (interval + notification stream)
+  // ----------------------------------------
+  const stopWaiting = () => {
+    if (pollIntervalRef.current) clearInterval(pollIntervalRef.current);
+    pollIntervalRef.current = null;
+
+    streamRef.current?.abort();
+    streamRef.current = null;
+  };
 
   // cleanup on unmount
-  useEffect(() => {
-    return () => {
-      if (pollInterval) clearInterval(pollInterval);
-    };
-  }, [pollInterval]);
+  useEffect(() => stopWaiting, []);
+
+  const handleMatchNotification = (notif: any) => {
+    if (notif?.type !== "match_found") return false;
+
+    stopWaiting();
+    setSearching(false);
+    onMatchFound(notif.session_id, notif.match);
+    return true;
+  };
 
   // ----------------------------------------
-  // POLL QUEUE AND NOTIFICATIONS
+  // POLL QUEUE (and notifications, if the stream is down)
   // ----------------------------------------
-  const pollQueueAndNotifications = async () => {
+  const pollQueue = async (withNotifications: boolean) => {
     try {
       // 1) Queue position
       const q = await fetch(getApiUrl("/api/v1/queue-status"), {
@@ -64,6 +81,8 @@ export function HomePage({
         setQueuePosition(qData.position);
       }
 
+      if (!withNotifications) return;
+
       // 2) Notification check (match found)
       const n = await fetch(getApiUrl("/api/v1/notifications"), {
         headers: { Authorization: `Bearer ${accessToken}` },
@@ -71,20 +90,59 @@ export function HomePage({
 
       if (n.ok) {
         const notifData = await n.json();
-        const matchNotif = notifData.notifications?.find(
-          (n: any) => n.type === "match_found"
-        );
+        notifData.notifications?.some(handleMatchNotification);
+      }
+    } catch (err) {
+      console.error("Polling error:", err);
+    }
+  };
+
+  const startPolling = (withNotifications: boolean) => {
+    if (pollIntervalRef.current) clearInterval(pollIntervalRef.current);
+    pollIntervalRef.current = setInterval(() => pollQueue(withNotifications), 2000);
+  };
+
+  // ----------------------------------------
+  // MATCH NOTIFICATIONS (SSE stream)
+  // fetch instead of EventSource: the stream needs the Authorization header
+  // ----------------------------------------
+  const listenForMatch = async () => {
+    const controller = new AbortController();
+    streamRef.current = controller;
+
+    try {
+      const res = await fetch(getApiUrl("/api/v1/notifications/stream"), {
+        headers: { Authorization: `Bearer ${accessToken}` },
+        signal: controller.signal,
+      });
+      if (!res.ok || !res.body) throw new Error(`Stream failed: ${res.status}`);
+
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = "";
 
-        if (matchNotif) {
-          if (pollInterval) clearInterval(pollInterval);
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
 
-          setSearching(false);
+        buffer += value;
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
 
-          onMatchFound(matchNotif.session_id, matchNotif.match);
+        for (const event of events) {
+          // ": ping" heartbeats carry no data
+          if (!event.startsWith("data: ")) continue;
+          if (handleMatchNotification(JSON.parse(event.slice(6)))) return;
         }
       }
     } catch (err) {
-      console.error("Polling error:", err);
+      if (controller.signal.aborted) return;
+      console.error("Notification stream error:", err);
+    }
+
+    // Stream ended without a match: fall back to polling notifications
+    if (streamRef.current === controller) {
+      streamRef.current = null;
+      startPolling(true);
     }
   };
 
@@ -124,9 +182,9 @@ export function HomePage({
       }
 
       if (data.status === "queued") {
-        // Start polling queue + notifications
-        const interval = setInterval(pollQueueAndNotifications, 2000);
-        setPollInterval(interval);
+        // Match arrives over the stream; only the queue position is polled
+        startPolling(false);
+        listenForMatch();
       }
     } catch (err) {
       console.error("Matchmaking start error:", err);
@@ -145,7 +203,7 @@ export function HomePage({
       });
     } catch (err) {}
 
-    if (pollInterval) clearInterval(pollInterval);
+    stopWaiting();
     setSearching(false);
     setQueuePosition(null);
   };
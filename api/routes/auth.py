@@ -1,14 +1,15 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Body, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, status, Depends, Body, UploadFile, File, Form, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from datetime import timedelta
+import asyncio
 import logging
 import os
 import shutil
 from pathlib import Path
 
 from app.db import get_db
-from app.deps import get_user_from_token
+from app.deps import get_user_from_token, UUIDStr
 from app.models import User
 from app.schemas.auth import (
     UserRegister, UserLogin, UserResponse, TokenResponse,
@@ -16,8 +17,11 @@ from app.schemas.auth import (
 )
 from app.core.security import (
     get_password_hash, authenticate_user, create_access_token,
-    create_refresh_token, verify_password, verify_token
+    create_refresh_token, verify_password, verify_token,
+    invalidate_user_cache,
 )
+from app.core.profile_cache import cache_user_profile, cached_response, response_key
+from app.core.user_stats import get_user_stats
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -59,11 +63,13 @@ async def register(
                 detail="Username already taken",
             )
 
+    password_hash = await asyncio.to_thread(get_password_hash, user_data.password)
+
     # Create new user
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         display_name=user_data.display_name or user_data.username,
         bio=user_data.bio,
         age=user_data.age,
@@ -76,6 +82,7 @@ async def register(
     await session.refresh(new_user)
 
     logger.info(f"New user registered: {new_user.id} ({new_user.email})")
+    await cache_user_profile(new_user)
 
     # Create tokens
     access_token = create_access_token(data={"sub": new_user.id})
@@ -117,6 +124,7 @@ async def login(
     refresh_token = create_refresh_token(data={"sub": user.id})
 
     logger.info(f"User logged in: {user.id} ({user.email})")
+    await cache_user_profile(user)
 
     return {
         "access_token": access_token,
@@ -179,15 +187,31 @@ async def refresh_token(
     }
 
 
-@router.get("/me", response_model=UserProfileResponse, dependencies=[Depends(get_user_from_token)])
+@router.get("/me", response_model=UserProfileResponse)
 async def get_me(
     current_user: User = Depends(get_user_from_token),
-) -> User:
+    session: AsyncSession = Depends(get_db),
+):
     """Get current user profile"""
-    return current_user
 
+    async def build() -> str:
+        profile = UserProfileResponse.model_validate(current_user)
+
+        # Aggregates come precomputed from mv_user_stats
+        stats = await get_user_stats(current_user.id, session)
+        if stats:
+            profile.avg_session_seconds = stats.avg_session_seconds or 0.0
+
+        return profile.model_dump_json()
 
-@router.put("/me", response_model=UserResponse, dependencies=[Depends(get_user_from_token)])
+    if current_user.updated_at is None:
+        return Response(await build(), media_type="application/json")
+
+    key = response_key("profile_me", current_user.id, current_user.updated_at)
+    return Response(await cached_response(key, current_user.id, build), media_type="application/json")
+
+
+@router.put("/me", response_model=UserResponse)
 async def update_profile(
     current_user: User = Depends(get_user_from_token),
     session: AsyncSession = Depends(get_db),
@@ -257,16 +281,17 @@ async def update_profile(
         current_user.avatar_url = f"/uploads/avatars/{filename}"
         logger.info(f"User avatar uploaded: {current_user.id} -> {filename}")
 
-    session.add(current_user)
     await session.commit()
     await session.refresh(current_user)
 
     logger.info(f"User profile updated: {current_user.id}")
+    await cache_user_profile(current_user)
+    await invalidate_user_cache(current_user.id)
 
     return current_user
 
 
-@router.post("/change-password", dependencies=[Depends(get_user_from_token)])
+@router.post("/change-password")
 async def change_password(
     request: PasswordChangeRequest,
     current_user: User = Depends(get_user_from_token),
@@ -281,46 +306,56 @@ async def change_password(
             detail="Current and new passwords are required",
         )
 
+    # The cached auth user carries no password hash: always read it from the DB
+    password_hash = await session.scalar(
+        select(User.password_hash).where(User.id == current_user.id)
+    )
+
     # Verify current password
-    if not verify_password(request.current_password, current_user.password_hash):
+    if not password_hash or not await asyncio.to_thread(verify_password, request.current_password, password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
 
     # Update password
-    current_user.password_hash = get_password_hash(request.new_password)
-    session.add(current_user)
+    new_hash = await asyncio.to_thread(get_password_hash, request.new_password)
+    await session.execute(
+        update(User).where(User.id == current_user.id).values(password_hash=new_hash)
+    )
     await session.commit()
 
     logger.info(f"User password changed: {current_user.id}")
+    await invalidate_user_cache(current_user.id)
 
     return {"message": "Password changed successfully"}
 
 
 @router.get("/user/{user_id}", response_model=UserResponse)
 async def get_user(
-    user_id: str,
+    user_id: UUIDStr,
     session: AsyncSession = Depends(get_db),
-) -> User:
+):
     """Get user by ID (public endpoint)"""
 
-    # Validate input
-    if not user_id or len(user_id.strip()) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User ID is required",
-        )
-
-    stmt = select(User).where(User.id == user_id)
-    result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
+    # Only updated_at is needed to find the cached body
+    updated_at = (await session.execute(
+        select(User.updated_at).where(User.id == user_id)
+    )).one_or_none()
 
-    if not user:
+    if not updated_at:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    return user
+    async def build() -> str:
+        user = (await session.execute(select(User).where(User.id == user_id))).scalar_one()
+        return UserResponse.model_validate(user).model_dump_json()
+
+    if updated_at[0] is None:
+        return Response(await build(), media_type="application/json")
+
+    key = response_key("profile", user_id, updated_at[0])
+    return Response(await cached_response(key, user_id, build), media_type="application/json")
 
@@ -1,5 +1,6 @@
 import json
 import logging
+from datetime import datetime
 from typing import Dict, Set
 
 from fastapi import (
@@ -10,12 +11,12 @@ from fastapi import (
     HTTPException,
     status,
 )
-from sqlalchemy import select
+from sqlalchemy import select, update, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import async_session, get_db
-from app.deps import get_user_from_token
-from app.models import User, ChatSession, Message
+from app.deps import get_user_from_token, UUIDStr
+from app.models import User, ChatSession, ChatSessionStatusEnum, Message
 from app.core.security import verify_token
 from app.config import settings
 
@@ -69,12 +70,23 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+async def end_chat_session(session_id: str) -> None:
+    """Mark an ACTIVE session ENDED; ended_at also fills in duration_seconds"""
+    async with async_session() as db:
+        await db.execute(
+            update(ChatSession)
+            .where(ChatSession.id == session_id, ChatSession.status == ChatSessionStatusEnum.ACTIVE)
+            .values(status=ChatSessionStatusEnum.ENDED, ended_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
 # ==========================================
 #   WEBSOCKET ROUTE
 # ==========================================
 
 @router.websocket("/chat/ws/{session_id}")
-async def websocket_chat(ws: WebSocket, session_id: str):
+async def websocket_chat(ws: WebSocket, session_id: UUIDStr):
 
     # 1) TOKEN VALIDATION
     token = ws.query_params.get("token")
@@ -94,14 +106,16 @@ async def websocket_chat(ws: WebSocket, session_id: str):
     logger.info(f"[WS AUTH] user={user_id}")
 
 
-    # 2) DB CHECKS
+    # 2) DB CHECKS (lambda_stmt: built once, re-run on every reconnect)
     async with async_session() as db:
-        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        user = (await db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id)))).scalar_one_or_none()
         if not user or user.is_banned:
             await ws.close(code=1008, reason="User banned or not found")
             return
 
-        chat = (await db.execute(select(ChatSession).where(ChatSession.id == session_id))).scalar_one_or_none()
+        chat = (await db.execute(
+            lambda_stmt(lambda: select(ChatSession).where(ChatSession.id == session_id))
+        )).scalar_one_or_none()
         if not chat:
             await ws.close(code=1008, reason="Session not found")
             return
@@ -215,13 +229,19 @@ async def websocket_chat(ws: WebSocket, session_id: str):
             "user_id": user_id
         })
 
+        # end_session or a dropped socket: the chat is over as soon as either side leaves
+        try:
+            await end_chat_session(session_id)
+        except Exception as e:
+            logger.error(f"[WS] could not end session {session_id}: {str(e)}")
+
 # ==========================================
 #   HTTP ENDPOINTS: HISTORY & SESSIONS
 # ==========================================
 
 @router.get("/history/{session_id}")
 async def get_chat_history(
-    session_id: str,
+    session_id: UUIDStr,
     current_user: User = Depends(get_user_from_token),
     session: AsyncSession = Depends(get_db),
 ) -> dict:
@@ -246,27 +266,23 @@ async def get_chat_history(
             detail="Not authorized to view this chat",
         )
 
-    # Mesajlarni olish
+    # Mesajlarni olish (plain rows: no ORM objects or identity map per message)
     stmt = (
-        select(Message)
+        select(
+            Message.id,
+            Message.sender_id,
+            Message.content,
+            Message.message_type,
+            Message.created_at,
+        )
         .where(Message.chat_session_id == session_id)
         .order_by(Message.created_at)
     )
     result = await session.execute(stmt)
-    messages = result.scalars().all()
 
     return {
         "session_id": session_id,
-        "messages": [
-            {
-                "id": msg.id,
-                "sender_id": msg.sender_id,
-                "content": msg.content,
-                "message_type": msg.message_type,
-                "created_at": msg.created_at,
-            }
-            for msg in messages
-        ],
+        "messages": [row._asdict() for row in result],
     }
 
 
@@ -279,30 +295,13 @@ async def get_user_sessions(
     Joriy user qatnashgan barcha chat sessiyalar ro'yxati.
     """
 
-    stmt = (
-        select(ChatSession)
-        .where(
-            (ChatSession.user_id_1 == current_user.id)
-            | (ChatSession.user_id_2 == current_user.id)
-        )
-        .order_by(ChatSession.created_at.desc())
-    )
+    # Opponent comes back joined on each row: one query, not one per session
+    stmt = ChatSession.with_opponent(current_user.id).order_by(ChatSession.created_at.desc())
 
     result = await session.execute(stmt)
-    sessions = result.scalars().all()
 
     sessions_data = []
-    for sess in sessions:
-        opponent_id = (
-            sess.user_id_2 if current_user.id == sess.user_id_1 else sess.user_id_1
-        )
-
-        opponent = None
-        if opponent_id:
-            opponent_stmt = select(User).where(User.id == opponent_id)
-            opponent_result = await session.execute(opponent_stmt)
-            opponent = opponent_result.scalar_one_or_none()
-
+    for sess, opponent in result:
         sessions_data.append(
             {
                 "session_id": sess.id,
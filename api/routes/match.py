@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, case
+from sqlalchemy.exc import IntegrityError
+import contextlib
 import logging
+import orjson
 
-from app.db import get_db
-from app.deps import get_user_from_token
+from app.db import async_session, get_db, insert
+from app.deps import get_user_from_token, security, UUIDStr
 from app.models import User, BlockedUser
 from app.schemas.match import MatchRequest, QueueStatus
 from app.core.matchmaking import (
@@ -13,9 +18,19 @@ from app.core.matchmaking import (
     find_match,
     get_queue_position,
     store_match,
-    is_user_in_queue
+    is_user_in_queue,
+    invalidate_blocked_peers,
+    add_blocked_pair,
+    remove_blocked_pair,
 )
 from app.core.notification import notification_manager
+from app.core.streaming import stream_json_list
+from app.core.security import get_current_user, invalidate_user_cache
+from app.core.profile_cache import (
+    cache_user_profile,
+    get_cached_user_profile,
+    profile_from_user,
+)
 
 logger = logging.getLogger("matchmaking")
 
@@ -24,24 +39,24 @@ router = APIRouter()
 # ======================================================
 # 🔥 FIND — MATCHMAKING BOSHLANADI
 # ======================================================
-@router.post("/find", dependencies=[Depends(get_user_from_token)])
+@router.post("/find")
 async def find_match_endpoint(
     request: MatchRequest,
     current_user: User = Depends(get_user_from_token),
     db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"[FIND] user={current_user.id} | prefs={request.preferences}")
+    logger.info("[FIND] user=%s | prefs=%s", current_user.id, request.preferences)
 
     # --------------------------------------------------------
     # 1) PENDING MATCH → frontend to‘g‘ri qabul qilishi shart
     # --------------------------------------------------------
     try:
         notifications = await notification_manager.get_notifications(current_user.id)
-        logger.info(f"[FIND] pending notifications: {notifications}")
+        logger.debug("[FIND] pending notifications: %r", notifications)
 
         for n in notifications:
             if isinstance(n, dict) and n.get("type") == "match_found":
-                logger.warning(f"[FIND] Delivering pending match to {current_user.id}")
+                logger.warning("[FIND] Delivering pending match to %s", current_user.id)
 
                 return {
                     "status": "matched",
@@ -50,14 +65,14 @@ async def find_match_endpoint(
                 }
 
     except Exception as e:
-        logger.exception(f"[ERROR] Notification read failed → {e}")
+        logger.exception("[ERROR] Notification read failed → %s", e)
 
     # --------------------------------------------------------
     # 2) Agar user allaqachon queue ichida bo‘lsa → queue-status qaytarish
     # --------------------------------------------------------
     if await is_user_in_queue(current_user.id):
         pos = await get_queue_position(current_user.id)
-        logger.info(f"[FIND] user {current_user.id} already in queue at pos={pos}")
+        logger.info("[FIND] user %s already in queue at pos=%s", current_user.id, pos)
 
         return {
             "status": "queued",
@@ -68,7 +83,6 @@ async def find_match_endpoint(
     # --------------------------------------------------------
     # 3) Userni queue’ga qo‘shamiz
     # --------------------------------------------------------
-    logger.info(f"[QUEUE] Add user={current_user.id}")
     await add_to_queue(current_user.id, request.preferences or {})
 
     # --------------------------------------------------------
@@ -80,18 +94,22 @@ async def find_match_endpoint(
         request.preferences or {}
     )
 
-    logger.info(f"[MATCH] immediate result → {current_user.id} got={matched_user_id}")
-
     # --------------------------------------------------------
     # 5) Match topildi → session yaratamiz va qaytaramiz
     # --------------------------------------------------------
     if matched_user_id:
-        stmt = select(User).where(User.id == matched_user_id)
-        matched_user = (await db.execute(stmt)).scalar_one_or_none()
+        matched_profile = await get_cached_user_profile(matched_user_id)
+
+        if matched_profile is None:
+            stmt = select(User).where(User.id == matched_user_id)
+            matched_user = (await db.execute(stmt)).scalar_one_or_none()
+
+            if not matched_user:
+                logger.error("[MATCH ERROR] matched user %s not found", matched_user_id)
+                return {"status": "queued"}
 
-        if not matched_user:
-            logger.error(f"[MATCH ERROR] matched user {matched_user_id} not found")
-            return {"status": "queued"}
+            await cache_user_profile(matched_user)
+            matched_profile = profile_from_user(matched_user)
 
         # **CURRENT_USER → CALLER**
         # **MATCHED_USER → CALLEE**
@@ -102,7 +120,8 @@ async def find_match_endpoint(
         )
 
         logger.info(
-            f"[MATCH SUCCESS] caller={current_user.id} callee={matched_user_id} session={chat_session.id}"
+            "[MATCH SUCCESS] caller=%s callee=%s session=%s",
+            current_user.id, matched_user_id, chat_session.id,
         )
 
         # CALLEE ga xabar yuborish
@@ -114,38 +133,26 @@ async def find_match_endpoint(
                 "match": {
                     "match_id": chat_session.id,
                     "user_id": current_user.id,
-                    "display_name": current_user.display_name,
-                    "gender": current_user.gender,
-                    "age": current_user.age,
-                    "country": current_user.country,
-                    "bio": current_user.bio,
-                    "avatar_url": current_user.avatar_url,
+                    **profile_from_user(current_user),
                 }
             }
         )
 
-        logger.info(f"[NOTIFY] sent to callee={matched_user_id}")
-
         # CALLER uchun response
         return {
             "status": "matched",
             "session_id": chat_session.id,
             "match": {
                 "match_id": chat_session.id,
-                "user_id": matched_user.id,
-                "display_name": matched_user.display_name,
-                "gender": matched_user.gender,
-                "age": matched_user.age,
-                "country": matched_user.country,
-                "bio": matched_user.bio,
-                "avatar_url": matched_user.avatar_url,
+                "user_id": matched_user_id,
+                **matched_profile,
             }
         }
 
     # --------------------------------------------------------
     # 6) Match topilmadi → queue’da kutadi
     # --------------------------------------------------------
-    logger.info(f"[QUEUE] No match for {current_user.id} → waiting")
+    logger.info("[QUEUE] No match for %s → waiting", current_user.id)
 
     return {
         "status": "queued",
@@ -156,13 +163,49 @@ async def find_match_endpoint(
 # ======================================================
 # 🔥 GET NOTIFICATIONS
 # ======================================================
-@router.get("/notifications", dependencies=[Depends(get_user_from_token)])
+@router.get("/notifications")
 async def get_notifications_endpoint(current_user: User = Depends(get_user_from_token)):
-    logger.info(f"[NOTIFS] User {current_user.id} requested notifications")
     data = await notification_manager.get_notifications(current_user.id)
     return {"notifications": data}
 
 
+# ======================================================
+# 🔥 NOTIFICATIONS STREAM (SSE)
+# ======================================================
+@router.get("/notifications/stream")
+async def notifications_stream(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    # Own short-lived DB session: the stream is long-lived and must not
+    # hold a pooled connection open while it waits.
+    async with async_session() as db:
+        user = await get_current_user(credentials.credentials, db)
+
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+
+    user_id = user.id
+    logger.info("[NOTIFS STREAM] open user=%s", user_id)
+
+    async def event_stream():
+        # aclosing: unsubscribe as soon as the response ends, not at GC
+        async with contextlib.aclosing(notification_manager.listen(user_id)) as notifications:
+            async for n in notifications:
+                if n is None:
+                    yield b": ping\n\n"
+                else:
+                    yield b"data: " + orjson.dumps(n) + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ======================================================
 # 🔥 QUEUE STATUS
 # ======================================================
@@ -170,8 +213,6 @@ async def get_notifications_endpoint(current_user: User = Depends(get_user_from_
 async def queue_status(
     current_user: User = Depends(get_user_from_token),
 ):
-    logger.info(f"[QUEUE STATUS] Check for user {current_user.id}")
-
     pos = await get_queue_position(current_user.id)
     if pos < 0:
         raise HTTPException(404, "User not in queue")
@@ -192,7 +233,7 @@ async def queue_status(
 async def cancel_matchmaking(
     current_user: User = Depends(get_user_from_token)
 ):
-    logger.info(f"[QUEUE CANCEL] {current_user.id}")
+    logger.info("[QUEUE CANCEL] %s", current_user.id)
     await remove_from_queue(current_user.id)
 
     return {"message": "Matchmaking canceled"}
@@ -203,36 +244,41 @@ async def cancel_matchmaking(
 # ======================================================
 @router.post("/block/{user_id}")
 async def block_user(
-    user_id: str,
+    user_id: UUIDStr,
     current_user: User = Depends(get_user_from_token),
     db: AsyncSession = Depends(get_db),
 ):
     if user_id == current_user.id:
         raise HTTPException(400, "Cannot block yourself")
 
-    stmt = select(User).where(User.id == user_id)
-    target = (await db.execute(stmt)).scalar_one_or_none()
+    # One statement: the FK rejects unknown users, the unique key
+    # turns a repeat block into a no-op
+    stmt = (
+        insert(BlockedUser)
+        .values(blocker_user_id=current_user.id, blocked_user_id=user_id)
+        .on_conflict_do_nothing(index_elements=["blocker_user_id", "blocked_user_id"])
+        .returning(BlockedUser.id)
+    )
 
-    if not target:
+    try:
+        inserted_id = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(404, "User not found")
 
-    stmt = select(BlockedUser).where(
-        (BlockedUser.blocker_user_id == current_user.id) &
-        (BlockedUser.blocked_user_id == user_id)
-    )
-
-    if (await db.execute(stmt)).scalar_one_or_none():
+    if inserted_id is None:
         raise HTTPException(400, "Already blocked")
 
-    rec = BlockedUser(
-        blocker_user_id=current_user.id,
-        blocked_user_id=user_id,
+    await add_blocked_pair(current_user.id, user_id, db)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(blocked_users_count=User.blocked_users_count + 1)
     )
-    db.add(rec)
-    current_user.blocked_users_count += 1
-    db.add(current_user)
 
     await db.commit()
+    await invalidate_blocked_peers(current_user.id, user_id)
+    await invalidate_user_cache(current_user.id)
     return {"message": "User blocked successfully"}
 
 
@@ -241,7 +287,7 @@ async def block_user(
 # ======================================================
 @router.post("/unblock/{user_id}")
 async def unblock_user(
-    user_id: str,
+    user_id: UUIDStr,
     current_user: User = Depends(get_user_from_token),
     db: AsyncSession = Depends(get_db),
 ):
@@ -255,12 +301,19 @@ async def unblock_user(
         raise HTTPException(404, "User not blocked")
 
     await db.delete(rec)
-    current_user.blocked_users_count = max(
-        0, current_user.blocked_users_count - 1
+    await remove_blocked_pair(current_user.id, user_id, db)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(blocked_users_count=case(
+            (User.blocked_users_count > 0, User.blocked_users_count - 1),
+            else_=0,
+        ))
     )
-    db.add(current_user)
 
     await db.commit()
+    await invalidate_blocked_peers(current_user.id, user_id)
+    await invalidate_user_cache(current_user.id)
     return {"message": "User unblocked successfully"}
 
 
@@ -270,21 +323,16 @@ async def unblock_user(
 @router.get("/blocked-list")
 async def blocked_list(
     current_user: User = Depends(get_user_from_token),
-    db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(BlockedUser).where(BlockedUser.blocker_user_id == current_user.id)
-    items = (await db.execute(stmt)).scalars().all()
-
-    users = []
-    for r in items:
-        stmt = select(User).where(User.id == r.blocked_user_id)
-        u = (await db.execute(stmt)).scalar_one_or_none()
-        if u:
-            users.append({
-                "id": u.id,
-                "display_name": u.display_name,
-                "avatar_url": u.avatar_url,
-                "blocked_at": r.created_at,
-            })
-
-    return {"blocked_users": users}
+    stmt = (
+        select(
+            User.id,
+            User.display_name,
+            User.avatar_url,
+            BlockedUser.created_at.label("blocked_at"),
+        )
+        .join(BlockedUser, BlockedUser.blocked_user_id == User.id)
+        .where(BlockedUser.blocker_user_id == current_user.id)
+    )
+
+    return stream_json_list("blocked_users", stmt)
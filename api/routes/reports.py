@@ -1,12 +1,16 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from pydantic import BaseModel, Field
+from typing import Optional
 import logging
 
-from app.db import get_db
-from app.deps import get_user_from_token
+from app.db import get_db, insert
+from app.deps import get_user_from_token, UUIDStr
 from app.models import User, Report, ReportStatusEnum, ReportReasonEnum, ChatSession, BlockedUser
+from app.core.matchmaking import invalidate_blocked_peers, add_blocked_pair
+from app.core.security import invalidate_user_cache
+from app.core.streaming import stream_json_list
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +18,10 @@ router = APIRouter()
 
 
 class ReportCreate(BaseModel):
-    reported_user_id: str
-    reason: str = Field(..., pattern="^(harassment|hate_speech|explicit_content|spam|inappropriate_behavior|other)$")
+    reported_user_id: UUIDStr
+    reason: ReportReasonEnum
     description: str = Field(None, max_length=1000)
-    chat_session_id: str = None
+    chat_session_id: Optional[UUIDStr] = None
 
 
 class ReportResponse(BaseModel):
@@ -76,33 +80,47 @@ async def create_report(
     report = Report(
         reporter_id=current_user.id,
         reported_user_id=report_data.reported_user_id,
-        reason=report_data.reason,
+        reason=report_data.reason.value,
         description=report_data.description,
         chat_session_id=report_data.chat_session_id,
         status=ReportStatusEnum.PENDING,
     )
 
-    # Automatically block the reported user
-    existing_block = await session.execute(
-        select(BlockedUser).where(
-            (BlockedUser.blocker_user_id == current_user.id) &
-            (BlockedUser.blocked_user_id == report_data.reported_user_id)
-        )
-    )
-
-    if not existing_block.scalar_one_or_none():
-        block = BlockedUser(
+    # Automatically block the reported user (no-op if already blocked)
+    stmt = (
+        insert(BlockedUser)
+        .values(
             blocker_user_id=current_user.id,
             blocked_user_id=report_data.reported_user_id,
-            reason=f"Reported for: {report_data.reason}",
+            reason=f"Reported for: {report_data.reason.value}",
+        )
+        .on_conflict_do_nothing(index_elements=["blocker_user_id", "blocked_user_id"])
+        .returning(BlockedUser.id)
+    )
+    inserted_id = (await session.execute(stmt)).scalar_one_or_none()
+
+    if inserted_id is not None:
+        await add_blocked_pair(current_user.id, report_data.reported_user_id, session)
+        await session.execute(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(blocked_users_count=User.blocked_users_count + 1)
         )
-        session.add(block)
-        current_user.blocked_users_count += 1
+
+    await session.execute(
+        update(User)
+        .where(User.id == report_data.reported_user_id)
+        .values(reports_count=User.reports_count + 1)
+    )
 
     session.add(report)
-    session.add(current_user)
     await session.commit()
 
+    await invalidate_user_cache(report_data.reported_user_id)
+    if inserted_id is not None:
+        await invalidate_blocked_peers(current_user.id, report_data.reported_user_id)
+        await invalidate_user_cache(current_user.id)
+
     logger.info(f"Report created: {report.id} by {current_user.id} against {report_data.reported_user_id}")
 
     return {
@@ -116,26 +134,16 @@ async def create_report(
 @router.get("/my-reports")
 async def get_my_reports(
     current_user: User = Depends(get_user_from_token),
-    session: AsyncSession = Depends(get_db),
-) -> dict:
+):
     """Get reports created by current user"""
 
-    stmt = select(Report).where(Report.reporter_id == current_user.id).order_by(Report.created_at.desc())
-    result = await session.execute(stmt)
-    reports = result.scalars().all()
+    stmt = (
+        select(Report.id, Report.reported_user_id, Report.reason, Report.status, Report.created_at)
+        .where(Report.reporter_id == current_user.id)
+        .order_by(Report.created_at.desc())
+    )
 
-    return {
-        "reports": [
-            {
-                "id": r.id,
-                "reported_user_id": r.reported_user_id,
-                "reason": r.reason,
-                "status": r.status,
-                "created_at": r.created_at.isoformat(),
-            }
-            for r in reports
-        ],
-    }
+    return stream_json_list("reports", stmt)
 
 
 @router.get("/pending")
@@ -145,12 +153,13 @@ async def get_pending_reports(
 ) -> dict:
     """Get pending reports against current user (for notification purposes)"""
 
-    stmt = select(Report).where(
+    # Only columns idx_report_pending carries, so Postgres can answer from the index
+    stmt = select(Report.id, Report.reason, Report.created_at).where(
         (Report.reported_user_id == current_user.id) &
         (Report.status == ReportStatusEnum.PENDING)
     )
     result = await session.execute(stmt)
-    reports = result.scalars().all()
+    reports = result.all()
 
     return {
         "pending_reports_count": len(reports),
@@ -167,7 +176,7 @@ async def get_pending_reports(
 
 @router.get("/{report_id}")
 async def get_report(
-    report_id: str,
+    report_id: UUIDStr,
     current_user: User = Depends(get_user_from_token),
     session: AsyncSession = Depends(get_db),
 ) -> dict:
@@ -1,8 +1,8 @@
 # Nekto Clone - Backend API
 
 # Import models to register them with Base.metadata
-from .models import User, ChatSession, Message, Report, BlockedUser
+from .models import User, ChatSession, Message, Report, BlockedUser, BlockedPair, UserStats
 
-__all__ = ["User", "ChatSession", "Message", "Report", "BlockedUser"]
+__all__ = ["User", "ChatSession", "Message", "Report", "BlockedUser", "BlockedPair", "UserStats"]
 
 
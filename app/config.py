@@ -20,6 +20,10 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "nekto_secure_password_123"
     POSTGRES_DB: str = "nekto"
 
+    # Connections all workers may hold together (pooled + overflow, incl. the
+    # user-stats refresher); 80 leaves headroom under Postgres' default max_connections=100
+    DB_MAX_CONNECTIONS: int = 80
+
     USE_SQLITE: bool = True
     SQLITE_DB_PATH: str = "nekto.db"
 
@@ -94,6 +98,7 @@ class Settings(BaseSettings):
     MATCH_TIMEOUT_SECONDS: int = 120
     MAX_MATCHES_PER_HOUR: int = 10
     MESSAGE_RETENTION_DAYS: int = 30
+    USER_STATS_REFRESH_SECONDS: int = 300
 
     # ----------------------------------
     # LOGGING
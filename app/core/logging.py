@@ -1,6 +1,10 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
+import orjson
 import structlog
-import json
 from pathlib import Path
 from pythonjsonlogger import jsonlogger
 
@@ -10,6 +14,13 @@ from ..config import settings
 log_dir = Path(settings.LOG_FILE).parent
 log_dir.mkdir(parents=True, exist_ok=True)
 
+
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    """json.dumps-compatible serializer backed by orjson"""
+    # Extra json.dumps kwargs (cls, indent, ensure_ascii) don't apply to orjson
+    return orjson.dumps(obj, default=default or str).decode()
+
+
 # Configure structlog
 structlog.configure(
     processors=[
@@ -21,25 +32,61 @@ structlog.configure(
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
         structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
     cache_logger_on_first_use=True,
 )
 
-# Configure standard logging
-logging.basicConfig(
-    level=settings.LOG_LEVEL,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+# Console handler
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 )
 
 # File handler with JSON formatting
 file_handler = logging.FileHandler(settings.LOG_FILE)
-file_handler.setFormatter(jsonlogger.JsonFormatter())
+file_handler.setFormatter(jsonlogger.JsonFormatter(json_serializer=_orjson_dumps))
+
+# Formatting and I/O for every handler happen on the listener thread,
+# the root logger itself only enqueues records
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+queue_handler = logging.handlers.QueueHandler(log_queue)
+log_listener = logging.handlers.QueueListener(
+    log_queue, stream_handler, file_handler, respect_handler_level=True
+)
 
 root_logger = logging.getLogger()
-root_logger.addHandler(file_handler)
+root_logger.setLevel(settings.LOG_LEVEL)
+root_logger.addHandler(queue_handler)
+
+_listener_lock = threading.Lock()
+_listener_running = False
+
+
+def start_logging() -> None:
+    """Start the listener thread; no-op while running, restarts it after stop_logging"""
+    global _listener_running
+    with _listener_lock:
+        if not _listener_running:
+            log_listener.start()
+            _listener_running = True
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener_running
+    with _listener_lock:
+        if _listener_running:
+            _listener_running = False
+            log_listener.stop()
+
+
+# Started on import so logging before the first lifespan isn't held back;
+# the lifespan stops/restarts it, atexit is the fallback for everything else
+start_logging()
+atexit.register(stop_logging)
 
 # Get logger
 logger = structlog.get_logger(__name__)
@@ -1,41 +1,155 @@
 import aioredis
-import json
 import logging
-from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Optional, Dict, List, Set, Tuple
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-
-try:
-    import aioredis
-    REDIS_AVAILABLE = True
-except ImportError:
-    REDIS_AVAILABLE = False
-    aioredis = None
+from sqlalchemy import select, update, delete, func, exists, lambda_stmt
 
 from ..config import settings
-from ..models import User, ChatSession
+from ..db import insert
+from ..models import User, ChatSession, ChatSessionStatusEnum
 
 logger = logging.getLogger(__name__)
 
+# Oldest queued users considered per find_match call
+MATCH_SCAN_LIMIT = 20
+
+# Only columns preference checks read
+PREFERENCE_COLUMNS = (User.gender, User.age, User.country)
+
 # Redis client
 redis_client: Optional[any] = None
 
-# Fallback in-memory cache for when Redis is unavailable
-in_memory_cache: Dict = {
-    "match_queue": {},
-    "rate_limits": {},
-    "sessions": {}
-}
+# INCR with the window TTL set on first hit, atomically server-side
+RATE_LIMIT_LUA = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return n
+"""
+rate_limit_script: Optional[any] = None
+
+# Cache a rebuilt blocked-peers set only if no block/unblock bumped the
+# version since the DB read; otherwise the stale set would outlive the block
+BLOCKED_PEERS_STORE_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('SADD', KEYS[1], '', unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+blocked_peers_store_script: Optional[any] = None
+
+# Take both users out of the queue only if both are still waiting, so a
+# pair that cancelled or was matched elsewhere meanwhile is never claimed
+CLAIM_PAIR_LUA = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) or not redis.call('ZSCORE', KEYS[1], ARGV[2]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+claim_pair_script: Optional[any] = None
+
+# GET ARGV[1] suffixed with the version counter at KEYS[1], in one round trip
+VERSIONED_GET_LUA = """
+local key = ARGV[1] .. ':' .. (redis.call('GET', KEYS[1]) or '0')
+return {key, redis.call('GET', key)}
+"""
+versioned_get_script: Optional[any] = None
+
+
+class MatchQueue:
+    """
+    In-memory stand-in for the Redis match queue ZSET.
+    add/remove/contains are O(1); position is O(N).
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # Every access takes the lock. Coroutines never hold it across an
+        # await, so it is uncontended on the event loop, but it keeps sync
+        # code in FastAPI's threadpool from racing the loop.
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, data: Dict) -> None:
+        # Re-joining moves the user to the back, like ZADD with a new score
+        with self._lock:
+            self._entries[user_id] = data
+            self._entries.move_to_end(user_id)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def claim_pair(self, user_id: str, other_id: str) -> bool:
+        """Remove both users if both are still queued; False (and no change) otherwise"""
+        with self._lock:
+            if user_id not in self._entries or other_id not in self._entries:
+                return False
+            del self._entries[user_id]
+            del self._entries[other_id]
+            return True
+
+    def position(self, user_id: str) -> int:
+        with self._lock:
+            if user_id not in self._entries:
+                return -1
+            for idx, uid in enumerate(self._entries):
+                if uid == user_id:
+                    return idx
+        return -1
+
+    def head(self, limit: int) -> List[str]:
+        with self._lock:
+            return list(islice(self._entries, limit))
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class RateLimitStore:
+    """
+    In-memory fixed-window counters: key -> (count, window end).
+    Window ends are time.monotonic() floats.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, key: str, limit: int, window: float) -> bool:
+        """Count a hit for key; True while within limit"""
+        now = time.monotonic()
+        with self._lock:
+            count, expires_at = self._entries.get(key, (0, 0.0))
+            if expires_at <= now:
+                count, expires_at = 0, now + window
+            count += 1
+            self._entries[key] = (count, expires_at)
+        return count <= limit
+
+
+# Fallback in-memory stores for when Redis is unavailable
+memory_queue = MatchQueue()
+memory_rate_limits = RateLimitStore()
 
 
 async def init_redis() -> None:
     """Initialize Redis connection with fallback"""
-    global redis_client
-
-    if not REDIS_AVAILABLE:
-        logger.warning("Redis not available, using in-memory cache")
-        return
+    global redis_client, rate_limit_script, blocked_peers_store_script, claim_pair_script, versioned_get_script
 
     try:
         redis_client = await aioredis.from_url(
@@ -45,6 +159,11 @@ async def init_redis() -> None:
         )
         # Test connection
         await redis_client.ping()
+        # Sent as EVALSHA after the first call
+        rate_limit_script = redis_client.register_script(RATE_LIMIT_LUA)
+        blocked_peers_store_script = redis_client.register_script(BLOCKED_PEERS_STORE_LUA)
+        claim_pair_script = redis_client.register_script(CLAIM_PAIR_LUA)
+        versioned_get_script = redis_client.register_script(VERSIONED_GET_LUA)
         logger.info("✅ Redis connected successfully")
     except Exception as e:
         logger.warning(f"⚠️ Redis connection failed: {str(e)}")
@@ -70,105 +189,136 @@ async def get_redis() -> Optional[any]:
     return redis_client
 
 
-async def add_to_queue(user_id: str, preferences: Optional[Dict] = None) -> None:
-    """Add user to matchmaking queue"""
-    queue_key = "match_queue"
+QUEUE_KEY = "match_queue"
+
+
+# Queue operations come in a Redis and an in-memory flavour; the public
+# functions below only pick one based on whether init_redis connected.
+
+async def _add_redis(user_id: str, preferences: Optional[Dict]) -> None:
+    joined_at = time.time()
+    try:
+        # Member is the user_id itself so lookups need no scan
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(QUEUE_KEY, {user_id: joined_at})
+            pipe.expire(QUEUE_KEY, settings.MATCH_TIMEOUT_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis error adding to queue: {str(e)}")
+        _add_memory(user_id, preferences)
+
 
-    user_data = {
+def _add_memory(user_id: str, preferences: Optional[Dict]) -> None:
+    memory_queue.add(user_id, {
         "user_id": user_id,
-        "joined_at": datetime.utcnow().isoformat(),
+        "joined_at": time.time(),
         "preferences": preferences or {},
-    }
+    })
 
-    redis = await get_redis()
 
-    if redis:
-        try:
-            await redis.zadd(
-                queue_key,
-                {json.dumps(user_data): datetime.utcnow().timestamp()}
-            )
-            await redis.expire(queue_key, settings.MATCH_TIMEOUT_SECONDS)
-        except Exception as e:
-            logger.error(f"Redis error adding to queue: {str(e)}")
-            # Fallback to in-memory
-            in_memory_cache[queue_key][user_id] = user_data
+async def add_to_queue(user_id: str, preferences: Optional[Dict] = None) -> None:
+    """Add user to matchmaking queue"""
+    if redis_client is None:
+        _add_memory(user_id, preferences)
     else:
-        # Use in-memory cache
-        in_memory_cache[queue_key][user_id] = user_data
+        await _add_redis(user_id, preferences)
+
+
+async def _remove_redis(user_id: str) -> None:
+    try:
+        await redis_client.zrem(QUEUE_KEY, user_id)
+    except Exception as e:
+        logger.error(f"Redis error removing from queue: {str(e)}")
+        memory_queue.remove(user_id)
 
 
 async def remove_from_queue(user_id: str) -> None:
     """Remove user from matchmaking queue"""
-    queue_key = "match_queue"
-    redis = await get_redis()
-
-    if redis:
-        try:
-            members = await redis.zrange(queue_key, 0, -1)
-            for member in members:
-                data = json.loads(member)
-                if data["user_id"] == user_id:
-                    await redis.zrem(queue_key, member)
-                    break
-        except Exception as e:
-            logger.error(f"Redis error removing from queue: {str(e)}")
-            if user_id in in_memory_cache[queue_key]:
-                del in_memory_cache[queue_key][user_id]
+    if redis_client is None:
+        memory_queue.remove(user_id)
     else:
-        # Use in-memory cache
-        if user_id in in_memory_cache[queue_key]:
-            del in_memory_cache[queue_key][user_id]
+        await _remove_redis(user_id)
+
+
+async def _position_redis(user_id: str) -> int:
+    try:
+        rank = await redis_client.zrank(QUEUE_KEY, user_id)
+    except Exception as e:
+        logger.error(f"Redis error getting queue position: {str(e)}")
+        return memory_queue.position(user_id)
+    return -1 if rank is None else rank
 
 
 async def get_queue_position(user_id: str) -> int:
     """Get user's position in matchmaking queue"""
-    queue_key = "match_queue"
-    redis = await get_redis()
+    if redis_client is None:
+        return memory_queue.position(user_id)
+    return await _position_redis(user_id)
 
-    if redis:
-        try:
-            members = await redis.zrange(queue_key, 0, -1)
-            for idx, member in enumerate(members):
-                data = json.loads(member)
-                if data["user_id"] == user_id:
-                    return idx
-        except Exception as e:
-            logger.error(f"Redis error getting queue position: {str(e)}")
-            # Fallback to in-memory
-            for idx, uid in enumerate(in_memory_cache[queue_key].keys()):
-                if uid == user_id:
-                    return idx
-    else:
-        # Use in-memory cache
-        for idx, uid in enumerate(in_memory_cache[queue_key].keys()):
-            if uid == user_id:
-                return idx
 
-    return -1
+async def _in_queue_redis(user_id: str) -> bool:
+    try:
+        return await redis_client.zscore(QUEUE_KEY, user_id) is not None
+    except Exception as e:
+        logger.error(f"Redis error in is_user_in_queue: {str(e)}")
+        return user_id in memory_queue
+
 
 async def is_user_in_queue(user_id: str) -> bool:
     """
     Check whether the user is currently in the matchmaking queue.
     Works with both Redis and in-memory fallback.
     """
-    queue_key = "match_queue"
-    redis = await get_redis()
+    if redis_client is None:
+        return user_id in memory_queue
+    return await _in_queue_redis(user_id)
 
-    # --- Redis mode ---
-    if redis:
-        try:
-            members = await redis.zrange(queue_key, 0, -1)
-            for member in members:
-                data = json.loads(member)
-                if data["user_id"] == user_id:
-                    return True
-            return False
-        except Exception as e:
-            logger.error(f"Redis error in is_user_in_queue: {str(e)}")
 
-    # --- In-Memory fallback ---
-    return user_id in in_memory_cache[queue_key]
+async def _find_match_redis(
+    user_id: str,
+    session: AsyncSession,
+    preferences: Optional[Dict]
+) -> Optional[str]:
+    try:
+        # Read-only scan: everyone stays queued (and visible to /queue-status)
+        # while candidates are checked against the DB
+        members = await redis_client.zrange(QUEUE_KEY, 0, MATCH_SCAN_LIMIT - 1)
+    except Exception as e:
+        logger.error(f"Redis error in find_match: {str(e)}")
+        return await _find_match_memory(user_id, session, preferences)
+
+    matched_id = await _pick_candidate(user_id, members, session, preferences)
+    if not matched_id:
+        return None
+
+    # Either side may have cancelled or been matched by another worker since
+    # the scan; the script takes both out of the queue in one step or neither
+    try:
+        claimed = await claim_pair_script(keys=[QUEUE_KEY], args=[user_id, matched_id])
+    except Exception as e:
+        logger.error(f"Redis error claiming match: {str(e)}")
+        return None
+
+    if not claimed:
+        logger.info("Match %s <-> %s lost to a concurrent find_match", user_id, matched_id)
+        return None
+    return matched_id
+
+
+async def _find_match_memory(
+    user_id: str,
+    session: AsyncSession,
+    preferences: Optional[Dict]
+) -> Optional[str]:
+    members = memory_queue.head(MATCH_SCAN_LIMIT)
+    matched_id = await _pick_candidate(user_id, members, session, preferences)
+
+    # head() is a snapshot and _pick_candidate awaits the DB, so either side
+    # may have been matched or left since; take both atomically or neither
+    if matched_id and not memory_queue.claim_pair(user_id, matched_id):
+        logger.info("Match %s <-> %s lost to a concurrent find_match", user_id, matched_id)
+        return None
+    return matched_id
 
 
 async def find_match(
@@ -180,84 +330,172 @@ async def find_match(
     Find a match for user from queue
     Returns matched user_id or None
     """
-    queue_key = "match_queue"
-    redis = await get_redis()
-    members = []
+    if redis_client is None:
+        return await _find_match_memory(user_id, session, preferences)
+    return await _find_match_redis(user_id, session, preferences)
 
-    if redis:
-        try:
-            members = await redis.zrange(queue_key, 0, -1)
-        except Exception as e:
-            logger.error(f"Redis error in find_match: {str(e)}")
-            members = list(in_memory_cache[queue_key].values())
-    else:
-        members = list(in_memory_cache[queue_key].values())
 
-    logger.debug(f"find_match: Looking for match for {user_id}, queue size: {len(members)}")
-
-    for member in members:
-        if isinstance(member, str):
-            data = json.loads(member)
-        else:
-            data = member
+async def _pick_candidate(
+    user_id: str,
+    members: List[str],
+    session: AsyncSession,
+    preferences: Optional[Dict] = None
+) -> Optional[str]:
+    """Return the first queued member user can be matched with"""
+    logger.debug("find_match: Looking for match for %s, queue size: %d", user_id, len(members))
 
-        candidate_id = data["user_id"]
+    blocked_peers = await get_blocked_peers(user_id, session)
 
+    candidates = []
+    for candidate_id in members:
         # Don't match with self
         if candidate_id == user_id:
             continue
 
         # Check if users are blocked
-        if await is_blocked(user_id, candidate_id, session):
-            logger.debug(f"Users {user_id} and {candidate_id} are blocked")
+        if candidate_id in blocked_peers:
+            logger.debug("Users %s and %s are blocked", user_id, candidate_id)
             continue
 
+        candidates.append(candidate_id)
+
+    # Fetch every remaining candidate in one query for preference checks
+    candidate_users = {}
+    if preferences and candidates:
+        stmt = select(*PREFERENCE_COLUMNS, User.id).where(User.id.in_(candidates))
+        candidate_users = {row.id: row for row in (await session.execute(stmt))}
+
+    for candidate_id in candidates:
         # Check preferences
         if preferences:
-            if not await check_preferences(candidate_id, preferences, session):
-                logger.debug(f"Preferences mismatch between {user_id} and {candidate_id}")
+            if not user_matches_preferences(candidate_users.get(candidate_id), preferences):
+                logger.debug("Preferences mismatch between %s and %s", user_id, candidate_id)
                 continue
 
-        # Found a match!
-        logger.info(f"Match found: {user_id} <-> {candidate_id}")
-        await remove_from_queue(user_id)
-        await remove_from_queue(candidate_id)
+        # blocked_peers may come from cache; confirm against the DB before pairing
+        if await is_blocked(user_id, candidate_id, session):
+            logger.debug("Users %s and %s are blocked", user_id, candidate_id)
+            continue
 
+        # Found a match!
+        logger.info("Match found: %s <-> %s", user_id, candidate_id)
         return candidate_id
 
-    logger.debug(f"No match found for {user_id}, keeping in queue")
+    logger.debug("No match found for %s, keeping in queue", user_id)
     return None
 
 
 async def is_blocked(user_id_1: str, user_id_2: str, session: AsyncSession) -> bool:
     """Check if users have blocked each other"""
-    from ..models import BlockedUser
-
-    stmt = select(BlockedUser).where(
-        (
-            (BlockedUser.blocker_user_id == user_id_1) &
-            (BlockedUser.blocked_user_id == user_id_2)
-        ) |
-        (
-            (BlockedUser.blocker_user_id == user_id_2) &
-            (BlockedUser.blocked_user_id == user_id_1)
-        )
+    from ..models import BlockedPair
+
+    a, b = BlockedPair.ordered(user_id_1, user_id_2)
+    stmt = lambda_stmt(lambda: select(exists().where(BlockedPair.a == a, BlockedPair.b == b)))
+
+    return bool(await session.scalar(stmt))
+
+
+async def add_blocked_pair(user_id_1: str, user_id_2: str, session: AsyncSession) -> None:
+    """Record the undirected pair after a block (no-op if already present)"""
+    from ..models import BlockedPair
+
+    if user_id_1 == user_id_2:
+        return
+
+    a, b = BlockedPair.ordered(user_id_1, user_id_2)
+    await session.execute(
+        insert(BlockedPair).values(a=a, b=b).on_conflict_do_nothing(index_elements=["a", "b"])
     )
 
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none() is not None
 
+async def remove_blocked_pair(blocker_id: str, blocked_id: str, session: AsyncSession) -> None:
+    """Drop the undirected pair after an unblock, unless the reverse block still stands"""
+    from ..models import BlockedUser, BlockedPair
+
+    reverse = await session.scalar(select(exists().where(
+        BlockedUser.blocker_user_id == blocked_id,
+        BlockedUser.blocked_user_id == blocker_id,
+    )))
+    if reverse:
+        return
+
+    a, b = BlockedPair.ordered(blocker_id, blocked_id)
+    await session.execute(delete(BlockedPair).where(BlockedPair.a == a, BlockedPair.b == b))
 
-async def check_preferences(
-    user_id: str,
-    preferences: Dict,
-    session: AsyncSession
-) -> bool:
-    """Check if user matches preferences"""
-    stmt = select(User).where(User.id == user_id)
-    result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
 
+BLOCKED_PEERS_TTL_SECONDS = 24 * 3600
+
+
+def _blocked_peers_keys(user_id: str) -> Tuple[str, str]:
+    return f"blocked:{user_id}", f"blocked_ver:{user_id}"
+
+
+async def get_blocked_peers(user_id: str, session: AsyncSession) -> Set[str]:
+    """
+    Users that user has blocked or been blocked by.
+    Cached in Redis as a set; rebuilt from the DB on miss.
+    """
+    from ..models import BlockedPair
+
+    key, ver_key = _blocked_peers_keys(user_id)
+    redis = await get_redis()
+    version = None
+
+    if redis:
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.smembers(key)
+                pipe.get(ver_key)
+                members, version = await pipe.execute()
+            if members:
+                # "" is a marker so an empty block list is still a cache hit
+                members.discard("")
+                return set(members)
+            version = version or "0"
+        except Exception as e:
+            logger.error(f"Redis error reading blocked peers: {str(e)}")
+
+    # One row per pair, whichever side blocked
+    stmt = select(BlockedPair.a, BlockedPair.b).where(
+        (BlockedPair.a == user_id) | (BlockedPair.b == user_id)
+    )
+    rows = (await session.execute(stmt)).all()
+    peers = {b if a == user_id else a for a, b in rows}
+
+    if redis and version is not None:
+        try:
+            await blocked_peers_store_script(
+                keys=[key, ver_key], args=[version, BLOCKED_PEERS_TTL_SECONDS, *peers]
+            )
+        except Exception as e:
+            logger.error(f"Redis error caching blocked peers: {str(e)}")
+
+    return peers
+
+
+async def invalidate_blocked_peers(*user_ids: str) -> None:
+    """
+    Drop cached blocked peers after a block/unblock and bump their versions,
+    so a rebuild that read the DB before the change can't store its result.
+    """
+    redis = await get_redis()
+    if not redis:
+        return
+
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            for uid in user_ids:
+                key, ver_key = _blocked_peers_keys(uid)
+                pipe.incr(ver_key)
+                pipe.expire(ver_key, 2 * BLOCKED_PEERS_TTL_SECONDS)
+                pipe.delete(key)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis error invalidating blocked peers: {str(e)}")
+
+
+def user_matches_preferences(user, preferences: Dict) -> bool:
+    """Check a loaded user (or PREFERENCE_COLUMNS row) against preferences"""
     if user is None:
         return False
 
@@ -295,14 +533,23 @@ async def store_match(
     chat_session = ChatSession(
         user_id_1=caller_id,   # ALWAYS CALLER
         user_id_2=callee_id,   # ALWAYS CALLEE
-        status="active",
+        status=ChatSessionStatusEnum.ACTIVE,
         started_at=datetime.utcnow()
     )
 
     db.add(chat_session)
+    await db.execute(
+        update(User)
+        .where(User.id.in_((caller_id, callee_id)))
+        .values(total_matches=User.total_matches + 1)
+    )
     await db.commit()
     await db.refresh(chat_session)
 
+    from .security import invalidate_user_cache
+    await invalidate_user_cache(caller_id)
+    await invalidate_user_cache(callee_id)
+
     logger.info(
         f"[STORE MATCH] Chat session created: {chat_session.id} | caller={caller_id} → callee={callee_id}"
     )
@@ -317,46 +564,13 @@ async def rate_limit_check(user_id: str) -> bool:
     Returns True if allowed, False if rate limited
     """
     key = f"matches:{user_id}"
-    redis = await get_redis()
 
-    if redis:
+    if redis_client is not None:
         try:
-            count = await redis.incr(key)
-            if count == 1:
-                await redis.expire(key, 3600)
+            count = await rate_limit_script(keys=[key], args=[3600])
             return count <= settings.MAX_MATCHES_PER_HOUR
         except Exception as e:
             logger.error(f"Redis rate limit error: {str(e)}")
-            # Fallback to in-memory
-            if key not in in_memory_cache["rate_limits"]:
-                in_memory_cache["rate_limits"][key] = {
-                    "count": 1,
-                    "expires_at": datetime.utcnow() + timedelta(hours=1)
-                }
-            else:
-                cache_entry = in_memory_cache["rate_limits"][key]
-                if cache_entry["expires_at"] > datetime.utcnow():
-                    cache_entry["count"] += 1
-                else:
-                    cache_entry["count"] = 1
-                    cache_entry["expires_at"] = datetime.utcnow() + timedelta(hours=1)
-
-            return in_memory_cache["rate_limits"][key]["count"] <= settings.MAX_MATCHES_PER_HOUR
-    else:
-        # Use in-memory cache
-        if key not in in_memory_cache["rate_limits"]:
-            in_memory_cache["rate_limits"][key] = {
-                "count": 1,
-                "expires_at": datetime.utcnow() + timedelta(hours=1)
-            }
-        else:
-            cache_entry = in_memory_cache["rate_limits"][key]
-            if cache_entry["expires_at"] > datetime.utcnow():
-                cache_entry["count"] += 1
-            else:
-                cache_entry["count"] = 1
-                cache_entry["expires_at"] = datetime.utcnow() + timedelta(hours=1)
-
-        return in_memory_cache["rate_limits"][key]["count"] <= settings.MAX_MATCHES_PER_HOUR
-
 
+    # Fallback to in-memory
+    return memory_rate_limits.check(key, settings.MAX_MATCHES_PER_HOUR, 3600.0)
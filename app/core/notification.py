@@ -1,18 +1,128 @@
 import asyncio
-from typing import Dict, List, Any
+import logging
+from typing import Dict, List, Any, Set, AsyncIterator, Optional
+
+import orjson
+
+from ..config import settings
+from .matchmaking import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def notification_channel(user_id: str) -> str:
+    return f"match:{user_id}"
+
+
+def notification_list_key(user_id: str) -> str:
+    return f"notifications:{user_id}"
+
 
 class NotificationManager:
     def __init__(self):
+        # Parked notifications and local listeners, used when Redis is unavailable
         self.user_notifications: Dict[str, List[Any]] = {}
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
 
     async def add_notification(self, user_id: str, notification: Any):
+        # Live delivery first; only park the notification in the list
+        # when nobody is listening right now.
+        redis = await get_redis()
+        if redis:
+            payload = orjson.dumps(notification)
+            try:
+                if await redis.publish(notification_channel(user_id), payload):
+                    return
+
+                # Parked in Redis so a poll served by any worker picks it up
+                key = notification_list_key(user_id)
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.rpush(key, payload)
+                    pipe.expire(key, settings.MATCH_TIMEOUT_SECONDS)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                logger.error(f"Redis notification error: {str(e)}")
+        else:
+            queues = self.subscribers.get(user_id)
+            if queues:
+                for queue in queues:
+                    queue.put_nowait(notification)
+                return
+
         if user_id not in self.user_notifications:
             self.user_notifications[user_id] = []
         self.user_notifications[user_id].append(notification)
 
     async def get_notifications(self, user_id: str) -> List[Any]:
         notifications = self.user_notifications.pop(user_id, [])
+
+        redis = await get_redis()
+        if redis:
+            key = notification_list_key(user_id)
+            try:
+                # Read and clear in one MULTI so a notification is handed out once
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.lrange(key, 0, -1)
+                    pipe.delete(key)
+                    parked, _ = await pipe.execute()
+                notifications.extend(orjson.loads(n) for n in parked)
+            except Exception as e:
+                logger.error(f"Redis error reading notifications: {str(e)}")
+
         return notifications
 
-notification_manager = NotificationManager()
+    async def listen(self, user_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Any]]:
+        """
+        Yield notifications for user as they arrive.
+        Yields None every `heartbeat` seconds while idle.
+        """
+        redis = await get_redis()
 
+        if redis:
+            channel = notification_channel(user_id)
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(channel)
+            try:
+                # Subscribe before draining so nothing slips in between
+                for n in await self.get_notifications(user_id):
+                    yield n
+
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=heartbeat
+                    )
+                    if message is None:
+                        yield None
+                        continue
+                    yield orjson.loads(message["data"])
+            except asyncio.CancelledError:
+                # Client went away mid-wait; still release the subscription below
+                logger.debug("Notification listener for %s cancelled", user_id)
+                raise
+            finally:
+                try:
+                    await pubsub.unsubscribe(channel)
+                    await pubsub.close()
+                except Exception as e:
+                    logger.error(f"Redis error closing notification pubsub: {str(e)}")
+        else:
+            queue: asyncio.Queue = asyncio.Queue()
+            self.subscribers.setdefault(user_id, set()).add(queue)
+            try:
+                for n in await self.get_notifications(user_id):
+                    yield n
+
+                while True:
+                    try:
+                        yield await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                    except asyncio.TimeoutError:
+                        yield None
+            finally:
+                queues = self.subscribers.get(user_id)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self.subscribers[user_id]
+
+notification_manager = NotificationManager()
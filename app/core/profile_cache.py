@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, Awaitable, Callable, Union
+
+import orjson
+
+from . import matchmaking
+from .matchmaking import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Public profile fields shared with matched peers
+PROFILE_FIELDS = ("display_name", "age", "gender", "country", "avatar_url", "bio")
+PROFILE_TTL_SECONDS = 24 * 3600
+
+# Serialized profile responses. The key carries updated_at plus a per-user version
+# bumped by invalidate_user_cache: updated_at alone is whole seconds on SQLite
+RESPONSE_TTL_SECONDS = 300
+RESPONSE_LOCK_SECONDS = 5
+RESPONSE_LOCK_WAIT = (0.05, 0.1, 0.2)
+
+
+def profile_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def profile_from_user(user) -> Dict[str, Any]:
+    """Build the public profile dict from a User row"""
+    return {field: getattr(user, field) for field in PROFILE_FIELDS}
+
+
+async def cache_user_profile(user) -> None:
+    """Store user's public profile in a Redis hash"""
+    redis = await get_redis()
+    if not redis:
+        return
+
+    # Values are JSON-encoded so None and ints survive the round-trip
+    mapping = {field: orjson.dumps(value) for field, value in profile_from_user(user).items()}
+
+    try:
+        key = profile_key(user.id)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, PROFILE_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis error caching profile: {str(e)}")
+
+
+async def get_cached_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Return cached public profile or None on miss"""
+    redis = await get_redis()
+    if not redis:
+        return None
+
+    try:
+        data = await redis.hgetall(profile_key(user_id))
+    except Exception as e:
+        logger.error(f"Redis error reading profile: {str(e)}")
+        return None
+
+    if not data:
+        return None
+
+    return {field: orjson.loads(data[field]) if field in data else None for field in PROFILE_FIELDS}
+
+
+def response_key(kind: str, user_id: str, updated_at: datetime) -> str:
+    return f"{kind}:{user_id}:{int(updated_at.timestamp() * 1_000_000)}"
+
+
+def response_version_key(user_id: str) -> str:
+    return f"profile_ver:{user_id}"
+
+
+async def cached_response(
+    key: str,
+    user_id: str,
+    build: Callable[[], Awaitable[str]],
+) -> Union[str, bytes]:
+    """
+    JSON body for key (at user_id's current response version) from Redis;
+    on miss, build() it and store it.
+    Only one caller per key rebuilds at a time, the others briefly wait for its result.
+    """
+    redis = await get_redis()
+    if not redis or not matchmaking.versioned_get_script:
+        return await build()
+
+    try:
+        key, body = await matchmaking.versioned_get_script(keys=[response_version_key(user_id)], args=[key])
+        if body is not None:
+            return body
+
+        locked = await redis.set(f"{key}:lock", "1", nx=True, ex=RESPONSE_LOCK_SECONDS)
+        if not locked:
+            for delay in RESPONSE_LOCK_WAIT:
+                await asyncio.sleep(delay)
+                body = await redis.get(key)
+                if body is not None:
+                    return body
+    except Exception as e:
+        logger.error(f"Redis error reading cached response: {str(e)}")
+        return await build()
+
+    body = await build()
+
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(key, RESPONSE_TTL_SECONDS, body)
+            # A waiter that gave up rebuilds too, but the lock is the holder's to release
+            if locked:
+                pipe.delete(f"{key}:lock")
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis error caching response: {str(e)}")
+
+    return body
@@ -1,14 +1,22 @@
+import asyncio
 import logging
+import time
+from collections import OrderedDict
 from typing import Optional
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
+import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, lambda_stmt, DateTime
+from sqlalchemy.orm import make_transient_to_detached
 import hashlib
+import hmac
+import orjson
 import secrets
 
 from ..config import settings
 from ..models import User
+from .matchmaking import get_redis
+from .profile_cache import response_version_key
 
 # Logging
 logger = logging.getLogger(__name__)
@@ -17,6 +25,28 @@ logger = logging.getLogger(__name__)
 HASH_ALGORITHM = "sha256"
 SALT_LENGTH = 32
 
+# JWT settings, resolved once at import
+_SECRET = settings.JWT_SECRET.encode()
+_ALG = settings.JWT_ALGORITHM
+_ALGORITHMS = [_ALG]
+_ACCESS_EXP = timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
+_REFRESH_EXP = timedelta(days=settings.JWT_REFRESH_EXPIRE_DAYS)
+_DECODE_OPTIONS = {"require": ["exp", "sub", "type"]}
+
+# Decoded token cache (LRU, entries dropped once expired)
+TOKEN_CACHE_SIZE = 8192
+_token_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+# Authenticated user cache
+USER_CACHE_TTL_SECONDS = 60
+
+
+def _hash_password(salt: str, password: str) -> bytes:
+    """SHA256 over the salt's hex text followed by the password"""
+    hash_obj = hashlib.sha256(salt.encode())
+    hash_obj.update(password.encode())
+    return hash_obj.digest()
+
 
 def get_password_hash(password: str) -> str:
     """
@@ -27,9 +57,7 @@ def get_password_hash(password: str) -> str:
         raise ValueError("Password cannot be empty")
 
     salt = secrets.token_hex(SALT_LENGTH // 2)  # Generate random salt
-    hash_obj = hashlib.sha256((salt + password).encode())
-    password_hash = hash_obj.hexdigest()
-    return f"{HASH_ALGORITHM}${salt}${password_hash}"
+    return f"{HASH_ALGORITHM}${salt}${_hash_password(salt, password).hex()}"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -47,12 +75,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             logger.warning(f"Invalid hash algorithm: {algorithm}")
             return False
 
-        # Recalculate hash with same salt
-        hash_obj = hashlib.sha256((salt + plain_password).encode())
-        calculated_hash = hash_obj.hexdigest()
-
-        # Constant-time comparison
-        return secrets.compare_digest(calculated_hash, stored_hash)
+        # Recalculate hash with same salt, compare raw digests in constant time
+        return hmac.compare_digest(_hash_password(salt, plain_password), bytes.fromhex(stored_hash))
     except (ValueError, AttributeError) as e:
         logger.warning(f"Password verification error: {str(e)}")
         return False
@@ -63,22 +87,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if not data or "sub" not in data:
         raise ValueError("Token data must include 'sub' (user_id)")
 
-    to_encode = data.copy()
-
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
-
-    to_encode.update({"exp": expire, "type": "access"})
+    expire = datetime.utcnow() + (expires_delta or _ACCESS_EXP)
 
     try:
-        encoded_jwt = jwt.encode(
-            to_encode,
-            settings.JWT_SECRET,
-            algorithm=settings.JWT_ALGORITHM
-        )
-        return encoded_jwt
+        return jwt.encode({**data, "exp": expire, "type": "access"}, _SECRET, algorithm=_ALG)
     except Exception as e:
         logger.error(f"Token creation error: {str(e)}")
         raise
@@ -89,34 +101,40 @@ def create_refresh_token(data: dict) -> str:
     if not data or "sub" not in data:
         raise ValueError("Token data must include 'sub' (user_id)")
 
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_EXPIRE_DAYS)
-
-    to_encode.update({"exp": expire, "type": "refresh"})
+    expire = datetime.utcnow() + _REFRESH_EXP
 
     try:
-        encoded_jwt = jwt.encode(
-            to_encode,
-            settings.JWT_SECRET,
-            algorithm=settings.JWT_ALGORITHM
-        )
-        return encoded_jwt
+        return jwt.encode({**data, "exp": expire, "type": "refresh"}, _SECRET, algorithm=_ALG)
     except Exception as e:
         logger.error(f"Refresh token creation error: {str(e)}")
         raise
 
 
+def _decode(token: str) -> dict:
+    """Decode and verify token signature, reusing earlier results"""
+    payload = _token_cache.get(token)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            _token_cache.move_to_end(token)
+            return payload
+        del _token_cache[token]
+
+    payload = jwt.decode(token, _SECRET, algorithms=_ALGORITHMS, options=_DECODE_OPTIONS)
+
+    _token_cache[token] = payload
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+    return payload
+
+
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Verify JWT token and return payload"""
     try:
         if not token:
             return None
 
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = _decode(token)
 
         # Verify token type
         if payload.get("type") != token_type:
@@ -130,7 +148,7 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
             return None
 
         return payload
-    except JWTError as e:
+    except jwt.PyJWTError as e:
         logger.debug(f"Token verification failed: {str(e)}")
         return None
     except Exception as e:
@@ -138,6 +156,79 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         return None
 
 
+def _user_cache_key(user_id: str) -> str:
+    return f"auth_user:{user_id}"
+
+
+# Never written to Redis; paths that need them (login, change-password) read the DB
+_UNCACHED_USER_FIELDS = frozenset({"password_hash"})
+_CACHED_USER_COLUMNS = tuple(
+    column for column in User.__table__.columns if column.key not in _UNCACHED_USER_FIELDS
+)
+
+
+def _dump_user(user: User) -> bytes:
+    # orjson writes datetimes as ISO 8601 strings
+    return orjson.dumps({column.key: getattr(user, column.key) for column in _CACHED_USER_COLUMNS})
+
+
+def _load_user(raw: str) -> User:
+    data = orjson.loads(raw)
+    for column in _CACHED_USER_COLUMNS:
+        if isinstance(column.type, DateTime) and data.get(column.key):
+            data[column.key] = datetime.fromisoformat(data[column.key])
+    return User(**data)
+
+
+async def _get_cached_user(user_id: str, session: AsyncSession) -> Optional[User]:
+    """Load user from Redis and attach it to session without a SELECT"""
+    redis = await get_redis()
+    if not redis:
+        return None
+
+    try:
+        raw = await redis.get(_user_cache_key(user_id))
+    except Exception as e:
+        logger.error(f"Redis error reading cached user: {str(e)}")
+        return None
+
+    if raw is None:
+        return None
+
+    user = _load_user(raw)
+    # Attach as persistent so later edits UPDATE instead of INSERT
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+
+async def _cache_user(user: User) -> None:
+    redis = await get_redis()
+    if not redis:
+        return
+
+    try:
+        await redis.setex(_user_cache_key(user.id), USER_CACHE_TTL_SECONDS, _dump_user(user))
+    except Exception as e:
+        logger.error(f"Redis error caching user: {str(e)}")
+
+
+async def invalidate_user_cache(user_id: str) -> None:
+    """Drop cached user after its row changes"""
+    redis = await get_redis()
+    if not redis:
+        return
+
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(_user_cache_key(user_id))
+            # Moves /me and /user/{id} to fresh response keys
+            pipe.incr(response_version_key(user_id))
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis error invalidating cached user: {str(e)}")
+
+
 async def get_current_user(
     token: str,
     session: AsyncSession
@@ -153,14 +244,19 @@ async def get_current_user(
         return None
 
     try:
-        # Get user from database
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
+        user = await _get_cached_user(user_id, session)
 
         if user is None:
-            logger.warning(f"User not found: {user_id}")
-            return None
+            # Get user from database (statement construction cached, user_id bound per call)
+            stmt = lambda_stmt(lambda: select(User).where(User.id == user_id))
+            result = await session.execute(stmt)
+            user = result.scalar_one_or_none()
+
+            if user is None:
+                logger.warning(f"User not found: {user_id}")
+                return None
+
+            await _cache_user(user)
 
         if user.is_banned:
             logger.warning(f"Banned user attempting to authenticate: {user_id}")
@@ -190,7 +286,7 @@ async def authenticate_user(
             logger.info(f"Login attempt with non-existent email: {email}")
             return None
 
-        if not verify_password(password, user.password_hash):
+        if not await asyncio.to_thread(verify_password, password, user.password_hash):
             logger.info(f"Failed login attempt for user: {email}")
             return None
 
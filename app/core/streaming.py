@@ -0,0 +1,32 @@
+from typing import AsyncIterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from ..db import async_session
+
+# Rows fetched per round-trip and written per chunk
+STREAM_BATCH_SIZE = 200
+
+
+async def _json_list_chunks(key: str, stmt: Select) -> AsyncIterator[bytes]:
+    # Own session: the response outlives the request's dependencies
+    async with async_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+        yield b'{"' + key.encode() + b'":['
+        first = True
+        async for rows in result.partitions():
+            chunk = b",".join(orjson.dumps(dict(row._mapping)) for row in rows)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]}"
+
+
+def stream_json_list(key: str, stmt: Select) -> StreamingResponse:
+    """
+    Stream {key: [row, ...]} as JSON, one batch of rows at a time.
+    Selected column names (or labels) become the object keys.
+    """
+    return StreamingResponse(_json_list_chunks(key, stmt), media_type="application/json")
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..config import settings
+from ..db import engine, IS_SQLITE
+from ..models import UserStats
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key; whichever worker holds it is the only one refreshing
+USER_STATS_LOCK_ID = 720_001
+
+
+async def get_user_stats(user_id: str, session: AsyncSession) -> Optional[UserStats]:
+    """Aggregated stats row for user (None until the next refresh picks them up)"""
+    return await session.get(UserStats, user_id)
+
+
+async def refresh_user_stats(conn: AsyncConnection) -> None:
+    """Rebuild mv_user_stats without blocking readers"""
+    await conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_user_stats"))
+
+
+async def _refresh_while_leader(conn: AsyncConnection) -> None:
+    """Refresh now and every interval for as long as this worker holds the lock"""
+    got_lock = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": USER_STATS_LOCK_ID})
+    if not got_lock:
+        return
+
+    logger.info("This worker refreshes mv_user_stats")
+    try:
+        while True:
+            try:
+                await refresh_user_stats(conn)
+            except Exception as e:
+                logger.error(f"User stats refresh failed: {str(e)}")
+            await asyncio.sleep(settings.USER_STATS_REFRESH_SECONDS)
+    finally:
+        # Session-level lock: the pooled connection outlives this task
+        await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": USER_STATS_LOCK_ID})
+
+
+async def run_user_stats_refresher() -> None:
+    """
+    Keep mv_user_stats fresh until cancelled. Every worker runs this, but only
+    the one holding the advisory lock refreshes (immediately, then every
+    USER_STATS_REFRESH_SECONDS); the rest retry the lock each interval.
+    """
+    # SQLite serves a plain view, nothing to refresh
+    if IS_SQLITE:
+        return
+
+    while True:
+        try:
+            async with engine.connect() as conn:
+                # No transaction left idle between refreshes
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await _refresh_while_leader(conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"User stats refresher error: {str(e)}")
+
+        await asyncio.sleep(settings.USER_STATS_REFRESH_SECONDS)
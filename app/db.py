@@ -1,3 +1,5 @@
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from typing import AsyncGenerator
@@ -7,26 +9,56 @@ from .config import settings
 
 logger = logging.getLogger(__name__)
 
+IS_SQLITE = "sqlite" in settings.DATABASE_URL.lower()
+
+# Dialect-specific INSERT (supports ON CONFLICT)
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
 # Create async engine - configure based on database type
-if "sqlite" in settings.DATABASE_URL.lower():
+if IS_SQLITE:
     # SQLite configuration (for local development)
+    # Single writer and cheap to open: pooling buys nothing
     engine = create_async_engine(
         settings.DATABASE_URL,
         echo=settings.DEBUG,
         future=True,
+        poolclass=NullPool,
     )
 else:
     # PostgreSQL configuration (for production)
+    # Pools are per process: split the connection budget across workers, a quarter as overflow
+    _worker_connections = max(settings.DB_MAX_CONNECTIONS // max(settings.WORKERS, 1), 2)
+    _max_overflow = _worker_connections // 4
     engine = create_async_engine(
         settings.DATABASE_URL,
         echo=settings.DEBUG,
         future=True,
-        pool_size=20,
-        max_overflow=0,
+        pool_size=_worker_connections - _max_overflow,
+        max_overflow=_max_overflow,
         pool_pre_ping=True,
-        pool_recycle=3600,
+        pool_recycle=1800,
+        # Multi-row INSERT ... VALUES batches for executemany, bounded for wide Text rows
+        insertmanyvalues_page_size=1000,
+        connect_args={
+            # Reuse prepared statements for the hot auth/match queries
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 1024,
+            # Short OLTP queries only pay JIT compile cost
+            "server_settings": {"jit": "off"},
+        },
     )
 
+if IS_SQLITE:
+    # SQLite ignores foreign keys unless enabled per connection
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 # Create async session maker
 async_session = async_sessionmaker(
     engine,
@@ -40,6 +72,11 @@ async_session = async_sessionmaker(
 Base = declarative_base()
 
 
+def enum_values(enum_cls) -> list:
+    """values_callable for Enum columns: store .value ("active"), not the member name"""
+    return [member.value for member in enum_cls]
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Database session dependency for FastAPI
@@ -59,8 +96,11 @@ async def init_db() -> None:
     """
     Initialize database - create all tables
     """
+    # Views are created by their own DDL hooks, not as tables
+    tables = [t for t in Base.metadata.sorted_tables if not t.info.get("is_view")]
+
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
         logger.info("Database tables created/verified")
 
 
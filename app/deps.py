@@ -1,6 +1,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import Annotated, Optional
+from uuid import UUID
+from pydantic import AfterValidator
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
@@ -13,6 +15,10 @@ logger = logging.getLogger(__name__)
 # Security scheme for Swagger
 security = HTTPBearer(description="JWT Bearer token")
 
+# Id param/field: malformed ids are rejected with 422 before reaching the DB,
+# valid ones are handed on as the canonical lowercase str the models use
+UUIDStr = Annotated[UUID, AfterValidator(str)]
+
 
 async def get_user_from_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
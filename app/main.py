@@ -2,15 +2,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
+import contextlib
 import logging
+import threading
 
 from .config import settings
-from .db import init_db, close_db
-from .core.logging import get_logger
+from .db import init_db, close_db, IS_SQLITE
+from .core.logging import get_logger, start_logging, stop_logging
 from .core.matchmaking import init_redis, close_redis
+from .core.user_stats import run_user_stats_refresher
 from api.routes import auth, match, chat, reports
 
 logger = get_logger(__name__)
@@ -20,18 +25,27 @@ logger = get_logger(__name__)
 async def lifespan(app: FastAPI):
     """Manage application startup and shutdown"""
     # Startup
+    # A previous lifespan in this process (reload, another TestClient) may have stopped it
+    start_logging()
     logger.info("Starting up application...")
     await init_db()
     await init_redis()
+    # Only the Postgres materialized view needs refreshing
+    stats_refresher = None if IS_SQLITE else asyncio.create_task(run_user_stats_refresher())
     logger.info("Application started successfully")
 
     yield
 
     # Shutdown
     logger.info("Shutting down application...")
+    if stats_refresher:
+        stats_refresher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await stats_refresher
     await close_redis()
     await close_db()
     logger.info("Application shut down successfully")
+    stop_logging()
 
 
 app = FastAPI(
@@ -42,6 +56,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
 )
 
 # Middleware
@@ -70,11 +85,36 @@ app.include_router(match.router, prefix=settings.API_V1_PREFIX, tags=["Matchmaki
 app.include_router(chat.router, prefix=settings.API_V1_PREFIX, tags=["Chat"])
 app.include_router(reports.router, prefix=settings.API_V1_PREFIX, tags=["Reports"])
 
+# Operations with any of these tags don't require a Bearer token
+_PUBLIC_TAGS = frozenset({"Infrastructure"})
+_openapi_lock = threading.Lock()
+
+
+def _add_bearer_security(openapi_schema: dict) -> None:
+    """Add Bearer security to every tagged, non-public operation"""
+    for path in openapi_schema.get("paths", {}).values():
+        for operation in path.values():
+            if not isinstance(operation, dict):
+                continue
+            tags = operation.get("tags")
+            if tags and _PUBLIC_TAGS.isdisjoint(tags):
+                operation.setdefault("security", [{"Bearer": []}])
+
+
 # Configure Swagger UI with Bearer token support
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
 
+    # Concurrent first hits wait here instead of each building the schema
+    with _openapi_lock:
+        if app.openapi_schema:
+            return app.openapi_schema
+        app.openapi_schema = _build_openapi()
+    return app.openapi_schema
+
+
+def _build_openapi() -> dict:
     openapi_schema = get_openapi(
         title=settings.PROJECT_NAME,
         version="1.0.0",
@@ -102,20 +142,9 @@ def custom_openapi():
     openapi_schema["security"] = [{"Bearer": []}]
 
     # Add security requirement to protected endpoints
-    for path in openapi_schema.get("paths", {}).values():
-        for operation in path.values():
-            if isinstance(operation, dict) and "tags" in operation:
-                tags = operation.get("tags", [])
-                # Add Bearer security to all non-public endpoints
-                public_tags = ["Infrastructure"]
-                is_public = any(tag in public_tags for tag in tags)
-
-                if not is_public:
-                    if "security" not in operation:
-                        operation["security"] = [{"Bearer": []}]
+    _add_bearer_security(openapi_schema)
 
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
+    return openapi_schema
 
 app.openapi = custom_openapi
 
@@ -2,7 +2,8 @@ from .user import User, UserStatusEnum
 from .chat_session import ChatSession, ChatSessionStatusEnum
 from .message import Message
 from .report import Report, ReportStatusEnum, ReportReasonEnum
-from .blocked_user import BlockedUser
+from .blocked_user import BlockedUser, BlockedPair
+from .user_stats import UserStats
 
 __all__ = [
     "User",
@@ -14,5 +15,7 @@ __all__ = [
     "ReportStatusEnum",
     "ReportReasonEnum",
     "BlockedUser",
+    "BlockedPair",
+    "UserStats",
 ]
 
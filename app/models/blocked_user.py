@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy import (
+    Column, String, Uuid, DateTime, ForeignKey, Index, CheckConstraint, DDL, event, inspect,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -10,22 +12,24 @@ from ..db import Base
 class BlockedUser(Base):
     __tablename__ = "blocked_users"
     __table_args__ = (
-        Index("idx_blocked_user_blocker", "blocker_user_id"),
+        # "Is X blocking Y?" is index-only; also serves blocker_user_id-only
+        # lookups (leading column)
+        Index("idx_blocked_pair", "blocker_user_id", "blocked_user_id", unique=True),
         Index("idx_blocked_user_blocked", "blocked_user_id"),
     )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
 
     # Users
-    blocker_user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
-    blocked_user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    blocker_user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
+    blocked_user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
 
     # Reason
     reason = Column(String(500), nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     blocker = relationship("User", back_populates="blocking", foreign_keys=[blocker_user_id])
@@ -34,3 +38,41 @@ class BlockedUser(Base):
     def __repr__(self) -> str:
         return f"<BlockedUser {self.blocker_user_id} blocked {self.blocked_user_id}>"
 
+
+
+class BlockedPair(Base):
+    """
+    Undirected block index: one row per pair with a block in either direction,
+    stored as (a, b) with a < b. BlockedUser keeps who blocked whom.
+    """
+    __tablename__ = "blocked_pairs"
+    __table_args__ = (
+        CheckConstraint("a < b", name="ck_blocked_pair_order"),
+        # The PK serves lookups by a; this one serves lookups by b
+        Index("idx_blocked_pair_b", "b"),
+    )
+
+    a = Column(Uuid(as_uuid=False), ForeignKey("users.id"), primary_key=True)
+    b = Column(Uuid(as_uuid=False), ForeignKey("users.id"), primary_key=True)
+
+    @staticmethod
+    def ordered(user_id_1: str, user_id_2: str) -> tuple:
+        """Canonical (a, b) for two user ids"""
+        return (user_id_1, user_id_2) if user_id_1 < user_id_2 else (user_id_2, user_id_1)
+
+    def __repr__(self) -> str:
+        return f"<BlockedPair {self.a} <-> {self.b}>"
+
+
+# Backfill from existing blocks when the pair table is first created
+event.listen(
+    BlockedPair.__table__,
+    "after_create",
+    DDL(
+        "INSERT INTO blocked_pairs (a, b) "
+        "SELECT DISTINCT "
+        "CASE WHEN blocker_user_id < blocked_user_id THEN blocker_user_id ELSE blocked_user_id END, "
+        "CASE WHEN blocker_user_id < blocked_user_id THEN blocked_user_id ELSE blocker_user_id END "
+        "FROM blocked_users WHERE blocker_user_id <> blocked_user_id"
+    ).execute_if(callable_=lambda ddl, target, bind, **kw: inspect(bind).has_table("blocked_users")),
+)
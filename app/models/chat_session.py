@@ -1,11 +1,21 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Index, Enum, Integer
+from sqlalchemy import Column, Uuid, DateTime, Boolean, ForeignKey, Index, Enum, Integer, Computed, text, select, case
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 import uuid
 
-from ..db import Base
+from ..db import Base, enum_values, IS_SQLITE
+from .user import User
+
+
+# Seconds between start and end; NULL while the session is running
+if IS_SQLITE:
+    DURATION_SQL = "CAST((julianday(ended_at) - julianday(started_at)) * 86400 AS INTEGER)"
+    USER_LO_SQL, USER_HI_SQL = "min(user_id_1, user_id_2)", "max(user_id_1, user_id_2)"
+else:
+    DURATION_SQL = "EXTRACT(EPOCH FROM (ended_at - started_at))::int"
+    USER_LO_SQL, USER_HI_SQL = "LEAST(user_id_1, user_id_2)", "GREATEST(user_id_1, user_id_2)"
 
 
 class ChatSessionStatusEnum(str, enum.Enum):
@@ -17,32 +27,42 @@ class ChatSessionStatusEnum(str, enum.Enum):
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
     __table_args__ = (
-        Index("idx_session_status", "status"),
+        # Only live sessions are probed by status; ended ones stay out of the index
+        Index(
+            "idx_session_active", "user_id_1", "user_id_2",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
         Index("idx_session_started", "started_at"),
+        # "Session between A and B" in either direction is one probe
+        Index("idx_session_pair", "user_lo", "user_hi"),
     )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
 
     # Users involved
-    user_id_1 = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
-    user_id_2 = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    user_id_1 = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False, index=True)
+    user_id_2 = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False, index=True)
+
+    # Unordered pair in canonical order; user_id_1/user_id_2 keep caller/callee roles
+    user_lo = Column(Uuid(as_uuid=False), Computed(USER_LO_SQL, persisted=True))
+    user_hi = Column(Uuid(as_uuid=False), Computed(USER_HI_SQL, persisted=True))
 
     # Status
-    status = Column(String(20), default=ChatSessionStatusEnum.ACTIVE)
+    status = Column(
+        Enum(ChatSessionStatusEnum, name="chat_session_status", values_callable=enum_values),
+        default=ChatSessionStatusEnum.ACTIVE,
+    )
     is_reported = Column(Boolean, default=False)
 
     # Duration
-    started_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, server_default=func.now())
     ended_at = Column(DateTime, nullable=True)
-    duration_seconds = Column(Integer, default=0)
-
-    # Connection info
-    user1_socket_id = Column(String(100), nullable=True)
-    user2_socket_id = Column(String(100), nullable=True)
+    duration_seconds = Column(Integer, Computed(DURATION_SQL, persisted=True))
 
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     user1 = relationship("User", back_populates="chat_sessions", foreign_keys=[user_id_1])
@@ -50,6 +70,19 @@ class ChatSession(Base):
     messages = relationship("Message", back_populates="chat_session", cascade="all, delete-orphan")
     reports = relationship("Report", back_populates="chat_session", cascade="all, delete-orphan")
 
+    @classmethod
+    def with_opponent(cls, viewer_id: str):
+        """
+        SELECT (ChatSession, opponent User) rows for sessions viewer_id took part in,
+        resolving the opponent in the same query.
+        """
+        opponent_id = case((cls.user_id_1 == viewer_id, cls.user_id_2), else_=cls.user_id_1)
+        return (
+            select(cls, User)
+            .outerjoin(User, User.id == opponent_id)
+            .where((cls.user_id_1 == viewer_id) | (cls.user_id_2 == viewer_id))
+        )
+
     def __repr__(self) -> str:
         return f"<ChatSession {self.id} between {self.user_id_1} and {self.user_id_2}>"
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Index
+from sqlalchemy import Column, String, Uuid, DateTime, Text, ForeignKey, Index, DDL, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -6,6 +6,9 @@ import uuid
 
 from ..db import Base
 
+# Hash partitions of messages on Postgres
+MESSAGE_PARTITIONS = 16
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -13,24 +16,27 @@ class Message(Base):
         Index("idx_message_session", "chat_session_id"),
         Index("idx_message_sender", "sender_id"),
         Index("idx_message_created", "created_at"),
+        # Keeps each partition's indexes small; WHERE chat_session_id = ? prunes to one
+        {"postgresql_partition_by": "HASH (chat_session_id)"},
     )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # The partition key has to be part of the primary key
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
 
     # Message content
     content = Column(Text, nullable=False)
     message_type = Column(String(20), default="text")  # text, image, video, file
 
     # References
-    chat_session_id = Column(String(36), ForeignKey("chat_sessions.id"), nullable=False, index=True)
-    sender_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    chat_session_id = Column(Uuid(as_uuid=False), ForeignKey("chat_sessions.id"), primary_key=True)
+    sender_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
 
     # Media
     media_url = Column(String(255), nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     chat_session = relationship("ChatSession", back_populates="messages")
@@ -39,3 +45,30 @@ class Message(Base):
     def __repr__(self) -> str:
         return f"<Message {self.id} in {self.chat_session_id}>"
 
+
+for _remainder in range(MESSAGE_PARTITIONS):
+    event.listen(
+        Message.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TABLE IF NOT EXISTS messages_p{_remainder} PARTITION OF messages "
+            f"FOR VALUES WITH (MODULUS {MESSAGE_PARTITIONS}, REMAINDER {_remainder})"
+        ).execute_if(dialect="postgresql"),
+    )
+
+def _lz4_supported(ddl, target, bind, **kw) -> bool:
+    """Postgres 14+ built with lz4 (older servers / builds keep pglz)"""
+    if bind.dialect.server_version_info < (14,):
+        return False
+    return bool(bind.scalar(text(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'"
+    )))
+
+
+# lz4 instead of pglz for TOASTed content; recurses into the partitions
+event.listen(
+    Message.__table__,
+    "after_create",
+    DDL("ALTER TABLE messages ALTER COLUMN content SET COMPRESSION lz4")
+    .execute_if(dialect="postgresql", callable_=_lz4_supported),
+)
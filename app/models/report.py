@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Index, Enum, Boolean
+from sqlalchemy import Column, String, Uuid, DateTime, Text, ForeignKey, Index, Enum, Boolean, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 import uuid
 
-from ..db import Base
+from ..db import Base, enum_values
 
 
 class ReportStatusEnum(str, enum.Enum):
@@ -27,30 +27,35 @@ class ReportReasonEnum(str, enum.Enum):
 class Report(Base):
     __tablename__ = "reports"
     __table_args__ = (
-        Index("idx_report_status", "status"),
         Index("idx_report_reporter", "reporter_id"),
-        Index("idx_report_created", "created_at"),
+        # Open queue only: resolved/dismissed reports never enter the index
+        Index(
+            "idx_report_pending", "reported_user_id", "created_at",
+            postgresql_where=text("status = 'pending'"),
+            postgresql_include=["id", "reason"],
+            sqlite_where=text("status = 'pending'"),
+        ),
     )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
 
     # Report details
-    reason = Column(String(50), default=ReportReasonEnum.OTHER)
+    reason = Column(Enum(ReportReasonEnum, name="report_reason", values_callable=enum_values), default=ReportReasonEnum.OTHER)
     description = Column(Text, nullable=True)
-    status = Column(String(20), default=ReportStatusEnum.PENDING)
+    status = Column(Enum(ReportStatusEnum, name="report_status", values_callable=enum_values), default=ReportStatusEnum.PENDING)
 
     # References
-    reporter_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
-    reported_user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
-    chat_session_id = Column(String(36), ForeignKey("chat_sessions.id"), nullable=True)
+    reporter_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
+    reported_user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False)
+    chat_session_id = Column(Uuid(as_uuid=False), ForeignKey("chat_sessions.id"), nullable=True)
 
     # Actions
     action_taken = Column(String(100), nullable=True)  # ban, warn, dismiss
     admin_notes = Column(Text, nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     resolved_at = Column(DateTime, nullable=True)
 
     # Relationships
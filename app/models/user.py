@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Enum, Float, ForeignKey, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Uuid, Integer, DateTime, Boolean, Enum, Float, ForeignKey, Index, select
+from sqlalchemy.orm import relationship, selectinload
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 import uuid
 
-from ..db import Base
+from ..db import Base, enum_values
 
 
 class UserStatusEnum(str, enum.Enum):
@@ -21,7 +21,7 @@ class User(Base):
     __tablename__ = "users"
     __table_args__ = (Index("idx_user_status", "status"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
     username = Column(String(50), unique=True, nullable=True, index=True)
     email = Column(String(100), unique=True, nullable=True, index=True)
     password_hash = Column(String(255), nullable=True)
@@ -35,7 +35,7 @@ class User(Base):
     country = Column(String(100), nullable=True)
 
     # Status
-    status = Column(String(20), default=UserStatusEnum.OFFLINE)
+    status = Column(Enum(UserStatusEnum, name="user_status", values_callable=enum_values), default=UserStatusEnum.OFFLINE)
     is_banned = Column(Boolean, default=False)
     ban_reason = Column(String(500), nullable=True)
     ban_until = Column(DateTime, nullable=True)
@@ -46,16 +46,27 @@ class User(Base):
     reports_count = Column(Integer, default=0)
 
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    last_online = Column(DateTime, default=func.now())
-
-    # Relationships
-    chat_sessions = relationship("ChatSession", back_populates="user1", foreign_keys="ChatSession.user_id_1")
-    messages_sent = relationship("Message", back_populates="sender", foreign_keys="Message.sender_id")
-    reports_made = relationship("Report", back_populates="reporter", foreign_keys="Report.reporter_id")
-    blocked_by = relationship("BlockedUser", back_populates="blocked_user", foreign_keys="BlockedUser.blocked_user_id")
-    blocking = relationship("BlockedUser", back_populates="blocker", foreign_keys="BlockedUser.blocker_user_id")
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    last_online = Column(DateTime, server_default=func.now())
+
+    # Relationships (never lazy-loaded: load them explicitly, e.g. with_full_profile())
+    chat_sessions = relationship("ChatSession", back_populates="user1", foreign_keys="ChatSession.user_id_1", lazy="raise")
+    messages_sent = relationship("Message", back_populates="sender", foreign_keys="Message.sender_id", lazy="raise")
+    reports_made = relationship("Report", back_populates="reporter", foreign_keys="Report.reporter_id", lazy="raise")
+    blocked_by = relationship("BlockedUser", back_populates="blocked_user", foreign_keys="BlockedUser.blocked_user_id", lazy="raise")
+    blocking = relationship("BlockedUser", back_populates="blocker", foreign_keys="BlockedUser.blocker_user_id", lazy="raise")
+
+    @classmethod
+    def with_full_profile(cls):
+        """SELECT for users with every relationship batch-loaded (one IN query each)"""
+        return select(cls).options(
+            selectinload(cls.blocking),
+            selectinload(cls.blocked_by),
+            selectinload(cls.reports_made),
+            selectinload(cls.chat_sessions),
+            selectinload(cls.messages_sent),
+        )
 
     def __repr__(self) -> str:
         return f"<User {self.username or self.id}>"
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Uuid, Integer, Float, DDL, event
+
+from ..db import Base
+
+
+# Per-user aggregates over chat sessions, reports and blocks
+USER_STATS_SELECT = """
+SELECT
+    u.id AS user_id,
+    (SELECT count(*) FROM chat_sessions c
+        WHERE c.user_id_1 = u.id OR c.user_id_2 = u.id) AS total_matches,
+    (SELECT count(*) FROM reports r
+        WHERE r.reported_user_id = u.id) AS reports_count,
+    (SELECT count(*) FROM blocked_users b
+        WHERE b.blocker_user_id = u.id) AS blocked_users_count,
+    (SELECT coalesce(avg(c.duration_seconds), 0) FROM chat_sessions c
+        WHERE (c.user_id_1 = u.id OR c.user_id_2 = u.id) AND c.ended_at IS NOT NULL) AS avg_session_seconds
+FROM users u
+"""
+
+
+class UserStats(Base):
+    """
+    Read-only mapping of mv_user_stats.
+    A materialized view on Postgres (refreshed periodically), a plain view on SQLite.
+    """
+    __tablename__ = "mv_user_stats"
+    # Skipped by init_db's create_all; created by the DDL below instead
+    __table_args__ = {"info": {"is_view": True}}
+
+    user_id = Column(Uuid(as_uuid=False), primary_key=True)
+    total_matches = Column(Integer)
+    reports_count = Column(Integer)
+    blocked_users_count = Column(Integer)
+    avg_session_seconds = Column(Float)
+
+    def __repr__(self) -> str:
+        return f"<UserStats {self.user_id}>"
+
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(f"CREATE MATERIALIZED VIEW IF NOT EXISTS mv_user_stats AS {USER_STATS_SELECT}")
+    .execute_if(dialect="postgresql"),
+)
+# REFRESH ... CONCURRENTLY needs a unique index
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL("CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_user_stats_user ON mv_user_stats (user_id)")
+    .execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(f"CREATE VIEW IF NOT EXISTS mv_user_stats AS {USER_STATS_SELECT}")
+    .execute_if(dialect="sqlite"),
+)
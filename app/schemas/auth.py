@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from typing import Optional, Literal
 from datetime import datetime
 
 
@@ -9,7 +9,7 @@ class UserBase(BaseModel):
     display_name: Optional[str] = Field(None, max_length=100)
     bio: Optional[str] = Field(None, max_length=500)
     age: Optional[int] = Field(None, ge=13, le=120)
-    gender: Optional[str] = Field(None, pattern="^(male|female|other)$")
+    gender: Optional[Literal["male", "female", "other"]] = None
     country: Optional[str] = None
 
 
@@ -40,6 +40,7 @@ class UserUpdate(BaseModel):
 
 
 class UserResponse(UserBase):
+    # Ids stay str: models map them as Uuid(as_uuid=False), so they arrive as text
     id: str
     avatar_url: Optional[str]
     status: str
@@ -48,13 +49,13 @@ class UserResponse(UserBase):
     created_at: datetime
     last_online: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserProfileResponse(UserResponse):
     reports_count: int
     blocked_users_count: int
+    avg_session_seconds: float = 0.0
 
 
 class TokenResponse(BaseModel):
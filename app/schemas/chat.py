@@ -1,11 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Literal
 from datetime import datetime
 
 
 class MessageCreate(BaseModel):
     content: str = Field(..., max_length=5000)
-    message_type: str = Field("text", pattern="^(text|image|video|file)$")
+    message_type: Literal["text", "image", "video", "file"] = "text"
     media_url: Optional[str] = None
 
 
@@ -18,12 +18,11 @@ class MessageResponse(BaseModel):
     media_url: Optional[str]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class WebRTCSignal(BaseModel):
-    type: str = Field(..., pattern="^(offer|answer|candidate)$")
+    type: Literal["offer", "answer", "candidate"]
     data: dict
 
 
@@ -39,10 +38,9 @@ class ChatSessionInfo(BaseModel):
     opponent_id: str
     opponent_info: dict
     started_at: datetime
-    duration_seconds: int
+    duration_seconds: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class EndSession(BaseModel):
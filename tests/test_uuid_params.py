@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter, ValidationError
+
+from app.main import app
+from app.deps import UUIDStr
+from app.models import ReportReasonEnum
+from api.routes.reports import ReportCreate
+
+USER_ID = "6f9619ff-8b86-d011-b42d-00c04fc964ff"
+
+# No context manager: lifespan (DB/Redis setup) is not needed for request validation
+client = TestClient(app)
+
+
+def test_uuid_str_normalizes_valid_id():
+    assert TypeAdapter(UUIDStr).validate_python(USER_ID.upper()) == USER_ID
+
+
+def test_uuid_str_rejects_malformed_id():
+    with pytest.raises(ValidationError):
+        TypeAdapter(UUIDStr).validate_python("not-a-uuid")
+
+
+def test_get_user_with_malformed_id_is_422():
+    response = client.get("/api/v1/user/not-a-uuid")
+    assert response.status_code == 422
+
+
+def test_report_with_malformed_ids_is_rejected():
+    reason = next(iter(ReportReasonEnum))
+    with pytest.raises(ValidationError):
+        ReportCreate(reported_user_id="1 OR 1=1", reason=reason)
+    with pytest.raises(ValidationError):
+        ReportCreate(reported_user_id=USER_ID, reason=reason, chat_session_id="abc")